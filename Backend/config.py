@@ -11,6 +11,7 @@ load_dotenv()
 
 HOST = "0.0.0.0"   # Écoute sur toutes les interfaces réseau
 PORT = 8000
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))   # Nombre de workers uvicorn
 
 
 # =============================================================================
@@ -72,8 +73,12 @@ DEFAULT_VOICE_FR = "ff_siwis"
 DEFAULT_VOICE_EN = "af_heart"
 DEFAULT_SPEED = 1.0
 MAX_TEXT_LENGTH = 2000
-TTS_OUTPUT_DIR = "tts/outputs"
-AUDIO_FORMAT = "wav"
+# Sur Linux, pointer vers un tmpfs (ex. /dev/shm/tts_outputs) évite le passage disque
+# entre l'écriture du WAV et sa relecture pour la réponse HTTP
+TTS_OUTPUT_DIR = os.getenv("TTS_OUTPUT_DIR", "tts/outputs")
+# "wav" (PCM 16 bits, défaut), "ogg" (Opus, ~15x plus léger) ou "flac" (sans perte)
+AUDIO_FORMAT = os.getenv("AUDIO_FORMAT", "wav").lower()
+TTS_WORKERS = int(os.getenv("TTS_WORKERS", "2"))   # Synthèses Kokoro simultanées max
 
 
 # =============================================================================
@@ -82,9 +87,19 @@ AUDIO_FORMAT = "wav"
 
 STT_MODEL_SIZE = "small"
 STT_DEVICE = "cuda"            # GPU — fallback "cpu" si pas de GPU disponible
-STT_COMPUTE_TYPE = "float16"   # Précision réduite — plus rapide sur GPU
+# Quantification int8 — poids 8 bits, moitié moins de bande passante mémoire que fp16,
+# perte de précision (WER) négligeable. Sur GPU, activations en float16 (int8_float16)
+STT_COMPUTE_TYPE = os.getenv("STT_COMPUTE_TYPE", "int8_float16" if STT_DEVICE == "cuda" else "int8")
 STT_MAX_FILE_SIZE_MB = 25
-STT_UPLOAD_DIR = "stt/uploads"
+# Workers > 1 : plusieurs appels .transcribe() simultanés depuis des threads différents
+STT_WORKERS = int(os.getenv("STT_WORKERS", "2"))
+# Threads CTranslate2 par transcription — cœurs répartis entre les workers par défaut :
+# threads × workers = nombre de cœurs, sans sursouscription quand les workers tournent ensemble
+STT_CPU_THREADS = int(os.getenv("STT_CPU_THREADS", str(max(1, (os.cpu_count() or 4) // STT_WORKERS))))
+# Fenêtres de 30s encodées par passe — 8 sur GPU, 4 sur CPU (mémoire/threads limités)
+STT_BATCH_SIZE = int(os.getenv("STT_BATCH", "8" if STT_DEVICE == "cuda" else "4"))
+# VAD Silero — ignore les silences avant l'encodeur ; "false" repasse en mode séquentiel
+STT_VAD_FILTER = os.getenv("STT_VAD_FILTER", "true").lower() in ("1", "true", "yes")
 
 
 # =============================================================================
@@ -111,11 +126,21 @@ LIBRETRANSLATE_API_KEY = ""
 STRETCH_TOLERANCE = 0.20   # Écart max autorisé lors du time-stretching (±20%)
 
 
+# =============================================================================
+# NETTOYAGE DES FICHIERS
+# =============================================================================
+
+REAPER_INTERVAL_SECONDS = 60
+# Fichiers audio_* générés — conservés 24h. Au-delà, l'historique TTS conserve l'entrée
+# mais n'expose plus de lien /audio/ (audio_url masqué par user_router)
+TTS_OUTPUT_MAX_AGE_SECONDS = int(os.getenv("TTS_OUTPUT_MAX_AGE_SECONDS", "86400"))
+
+
 # =============================================================================
 # LOGS
 # =============================================================================
 
-LOG_LEVEL = "INFO"
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
 
 # =============================================================================
 # EMAIL SMTP
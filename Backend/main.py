@@ -1,23 +1,49 @@
 import os
+import sys
+import time
+import asyncio
 import logging
+import orjson
 import uvicorn
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
+from fastapi import FastAPI, Response
+
+class FastFormatter(logging.Formatter):
+    # strftime exécuté une fois par seconde au lieu d'une fois par log —
+    # seules les millisecondes sont recalculées à chaque enregistrement
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._cached = (-1, "")  # (seconde, date formatée) — tuple pour une mise à jour atomique
+
+    def formatTime(self, record, datefmt=None):
+        if datefmt:
+            return super().formatTime(record, datefmt)
+        second = int(record.created)
+        cached_second, cached_str = self._cached
+        if second != cached_second:
+            cached_str = time.strftime("%Y-%m-%d %H:%M:%S", self.converter(second))
+            self._cached = (second, cached_str)
+        return "%s,%03d" % (cached_str, record.msecs)
+
 
 # Logging initialisé en premier pour capturer les erreurs d'import éventuelles
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s | %(name)s | %(levelname)s | %(message)s"
-)
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(FastFormatter("%(asctime)s | %(name)s | %(levelname)s | %(message)s"))
+logging.basicConfig(level=logging.INFO, handlers=[_log_handler])
 logger = logging.getLogger(__name__)
 
 from config import (
-    HOST, PORT,
-    TTS_OUTPUT_DIR, STT_UPLOAD_DIR,
-    YOUTUBE_TEMP_DIR, YOUTUBE_OUTPUT_DIR
+    HOST, PORT, WEB_CONCURRENCY, LOG_LEVEL,
+    TTS_OUTPUT_DIR,
+    YOUTUBE_TEMP_DIR, YOUTUBE_OUTPUT_DIR,
+    TTS_OUTPUT_MAX_AGE_SECONDS, REAPER_INTERVAL_SECONDS
 )
 
+# Niveau effectif appliqué une fois la config chargée — WARNING en prod coupe
+# la construction des enregistrements INFO dès le test de niveau
+logging.getLogger().setLevel(LOG_LEVEL)
+
 from database import engine
 
 # Imports nécessaires pour enregistrer les modèles dans SQLAlchemy Base
@@ -32,17 +58,63 @@ from routers.youtube_router import router as youtube_router
 from routers.auth_router import router as auth_router
 from routers.user_router import router as users_router
 
+from middleware.cors_asgi import FastCORS
+from middleware.access_log import AccessLog
+from responses import AudioStaticFiles
+from tts.tts_service import AUDIO_FILENAME_PREFIX, AUDIO_MEDIA_TYPES
+
+def _reap_old_files(directory: str, prefix: str, max_age: float) -> int:
+    # scandir — type et stat obtenus sans open() par entrée.
+    # Seuls les fichiers générés par le service (prefix) sont concernés — les
+    # fichiers suivis par git ou déposés par un opérateur ne sont jamais supprimés
+    cutoff = time.time() - max_age
+    removed = 0
+    try:
+        entries = list(os.scandir(directory))
+    except FileNotFoundError:
+        return 0
+
+    for entry in entries:
+        try:
+            if entry.name.startswith(prefix) and entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.unlink(entry.path)
+                removed += 1
+        except OSError:
+            pass  # Supprimé entre-temps ou verrouillé — retenté au prochain passage
+    return removed
+
+
+async def _reaper_loop() -> None:
+    # Nettoyage périodique hors chemin critique des requêtes — rattrape aussi
+    # les fichiers laissés par un crash
+    while True:
+        await asyncio.sleep(REAPER_INTERVAL_SECONDS)
+        try:
+            removed = await asyncio.to_thread(
+                _reap_old_files, TTS_OUTPUT_DIR, AUDIO_FILENAME_PREFIX, TTS_OUTPUT_MAX_AGE_SECONDS
+            )
+            if removed:
+                logger.info("Nettoyage %s : %d fichier(s) expiré(s) supprimé(s)", TTS_OUTPUT_DIR, removed)
+        except Exception as e:
+            # Ne jamais laisser une exception tuer la boucle de nettoyage
+            logger.error("Erreur nettoyage %s : %s", TTS_OUTPUT_DIR, e)
+
+
 # Cycle de vie déclaré avant app pour pouvoir être passé en paramètre
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Création des répertoires de travail si absents
-    for directory in [TTS_OUTPUT_DIR, STT_UPLOAD_DIR, YOUTUBE_TEMP_DIR, YOUTUBE_OUTPUT_DIR]:
+    for directory in [TTS_OUTPUT_DIR, YOUTUBE_TEMP_DIR, YOUTUBE_OUTPUT_DIR]:
         os.makedirs(directory, exist_ok=True)
-        logger.info(f"Dossier prêt : {directory}")
+        logger.info("Dossier prêt : %s", directory)
     logger.info("Base de données connectée")
 
+    reaper = asyncio.create_task(_reaper_loop())
+
     yield  # Serveur actif — traitement des requêtes
 
+    reaper.cancel()
+
     # Libération du pool de connexions PostgreSQL
     await engine.dispose()
     logger.info("Connexions base de données fermées")
@@ -55,13 +127,11 @@ app = FastAPI(
 )
 
 # CORS permissif — à restreindre aux origines connues en production
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# ASGI pur avec headers précalculés — évite la reconstruction des headers par requête
+app.add_middleware(FastCORS)
+
+# Log d'accès unique par requête — statut + durée, en ASGI pur
+app.add_middleware(AccessLog)
 
 # Enregistrement des routers — chaque domaine gère son propre préfixe
 app.include_router(auth_router)
@@ -70,16 +140,41 @@ app.include_router(tts_router)
 app.include_router(sst_router)
 app.include_router(youtube_router)
 
+# Fichiers audio TTS servis en statique — pas de routing FastAPI ni de dépendances,
+# StaticFiles gère le 404 et bloque la traversée de répertoire. Type MIME et
+# Content-Disposition: attachment conservés comme avec l'ancienne route
+app.mount(
+    "/audio",
+    AudioStaticFiles(directory=TTS_OUTPUT_DIR, check_dir=False, media_types=AUDIO_MEDIA_TYPES),
+    name="audio"
+)
+
+# Corps pré-encodé — sondes de liveness à haute fréquence, zéro sérialisation par appel
+_HEALTH_BODY = orjson.dumps({
+    "status": "ok",
+    "message": "L'API Kokoro TTS est opérationnelle",
+    "version": "2.0.0"
+})
+
 # Endpoint de santé — utilisé par les load balancers et outils de monitoring
-@app.get("/health")
+@app.get("/health", response_model=None)
 async def health_check():
-    return {
-        "status": "ok",
-        "message": "L'API Kokoro TTS est opérationnelle",
-        "version": "2.0.0"
-    }
+    return Response(content=_HEALTH_BODY, media_type="application/json")
 
-# Lancement direct uniquement en développement — en prod, uvicorn est appelé en CLI
+# Lancement direct — DEV=1 active l'autoreload (incompatible avec plusieurs workers)
 if __name__ == "__main__":
-    logger.info(f"Démarrage du serveur sur http://{HOST}:{PORT}")
-    uvicorn.run("main:app", host=HOST, port=PORT, reload=True)
\ No newline at end of file
+    logger.info("Démarrage du serveur sur http://%s:%s", HOST, PORT)
+    dev = bool(os.environ.get("DEV"))
+    uvicorn.run(
+        "main:app",
+        host=HOST,
+        port=PORT,
+        reload=dev,
+        loop="asyncio" if sys.platform == "win32" else "uvloop",  # uvloop indisponible sous Windows
+        http="httptools",
+        # 1 par défaut — chaque worker recharge Kokoro + Whisper, et les jobs YouTube
+        # sont en mémoire (job_manager) : le polling /youtube/status doit tomber sur le même processus
+        workers=1 if dev else WEB_CONCURRENCY,
+        log_config=None,  # Conserve le format de logging.basicConfig
+        access_log=False,  # AccessLog journalise déjà chaque requête — évite le doublon uvicorn.access
+    )
\ No newline at end of file
@@ -0,0 +1,32 @@
+import logging
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger("access")
+
+
+class AccessLog:
+    # Un seul log par requête, formaté en %-args — la chaîne n'est construite
+    # que si un handler consomme réellement l'enregistrement
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not logger.isEnabledFor(logging.INFO):
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                logger.info(
+                    "%s %s | %d | %.1fms",
+                    scope["method"], scope["path"], message["status"],
+                    (time.perf_counter() - start) * 1000,
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
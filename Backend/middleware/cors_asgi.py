@@ -0,0 +1,72 @@
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Headers exposés au frontend — métadonnées de génération lues par fetch()
+DEFAULT_EXPOSE_HEADERS = b"X-Generation-Duration, X-Audio-Filename, Content-Disposition"
+
+
+class FastCORS:
+    # Middleware ASGI pur — headers précalculés une seule fois au démarrage,
+    # aucun objet Request/Headers construit par requête
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        allow_origin: bytes = b"*",
+        expose: bytes = DEFAULT_EXPOSE_HEADERS,
+    ) -> None:
+        self.app = app
+        self._origin = allow_origin
+        self._expose = expose
+
+        # Réponse aux preflight — Access-Control-Allow-Headers ajouté à la volée
+        # car "*" ne couvre pas Authorization côté navigateur
+        self._preflight_headers = [
+            (b"access-control-allow-origin", allow_origin),
+            (b"access-control-allow-methods", b"GET, POST, OPTIONS"),
+            (b"access-control-max-age", b"600"),
+            (b"content-length", b"0"),
+        ]
+        self._simple_headers = [
+            (b"access-control-allow-origin", allow_origin),
+            (b"access-control-expose-headers", expose),
+        ]
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Scan unique des headers — seuls origin et access-control-request-* comptent
+        origin = None
+        request_method = None
+        request_headers = None
+        for name, value in scope["headers"]:
+            if name == b"origin":
+                origin = value
+            elif name == b"access-control-request-method":
+                request_method = value
+            elif name == b"access-control-request-headers":
+                request_headers = value
+
+        # Requête sans Origin — pas de CORS, passage direct
+        if origin is None:
+            await self.app(scope, receive, send)
+            return
+
+        # Preflight — réponse 204 immédiate sans traverser le routing FastAPI
+        if scope["method"] == "OPTIONS" and request_method is not None:
+            headers = list(self._preflight_headers)
+            if request_headers:
+                headers.append((b"access-control-allow-headers", request_headers))
+            await send({"type": "http.response.start", "status": 204, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        simple_headers = self._simple_headers
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + simple_headers
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
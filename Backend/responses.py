@@ -0,0 +1,45 @@
+import os
+from typing import Any
+
+import orjson
+from fastapi.responses import FileResponse, JSONResponse
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.staticfiles import NotModifiedResponse
+
+
+class OrjsonResponse(JSONResponse):
+    # Sérialisation orjson — ORJSONResponse de FastAPI est dépréciée depuis 0.13x,
+    # même rendu sans l'avertissement à chaque instanciation
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+class AudioStaticFiles(StaticFiles):
+    # StaticFiles avec le contrat de l'ancienne route /audio/{filename} : type MIME
+    # exact (audio/wav et non audio/x-wav de mimetypes) et téléchargement en pièce jointe
+    def __init__(self, *, media_types: dict[str, str], **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.media_types = media_types  # extension sans point → type MIME
+
+    def file_response(
+        self,
+        full_path: str | os.PathLike[str],
+        stat_result: os.stat_result,
+        scope,
+        status_code: int = 200,
+    ) -> Response:
+        filename = os.path.basename(full_path)
+        response = FileResponse(
+            full_path,
+            status_code=status_code,
+            stat_result=stat_result,
+            media_type=self.media_types.get(filename.rpartition(".")[2]),
+            filename=filename,  # → Content-Disposition: attachment; filename="..."
+        )
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
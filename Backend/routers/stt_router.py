@@ -1,21 +1,37 @@
 import os
-import uuid
+import time
+import asyncio
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 
+import numpy as np
+import orjson
 from fastapi import APIRouter, HTTPException, File, UploadFile, Depends
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, desc
 
-from stt.stt_service import transcribe_audio, get_supported_languages
-from config import STT_UPLOAD_DIR, STT_MAX_FILE_SIZE_MB
+from stt.stt_service import (
+    transcribe_audio, stream_transcription, assemble_text, decode_upload, get_supported_languages
+)
+from config import STT_MAX_FILE_SIZE_MB, STT_WORKERS
 from database import get_db
 from models.job_stt import JobSTT
 from models.user import User
 from auth.dependencies import get_optional_user
+from responses import OrjsonResponse
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/stt")
 
+# Préfixes MIME acceptés — tuple constant, testé en un seul appel C par startswith()
+ALLOWED_AUDIO_TYPE_PREFIXES = ("audio/", "video/webm")
+
+# Pool borné à STT_WORKERS — autant de transcriptions simultanées que le modèle
+# en accepte (num_workers), sans sursouscrire la VRAM
+_STT_POOL = ThreadPoolExecutor(max_workers=STT_WORKERS, thread_name_prefix="stt")
+
 
 async def _cleanup_old_jobs_stt(user_id: str, db: AsyncSession) -> None:
     # Conserve uniquement les 5 jobs les plus récents — tri par date décroissante
@@ -30,7 +46,7 @@ async def _cleanup_old_jobs_stt(user_id: str, db: AsyncSession) -> None:
         jobs_to_delete = jobs[5:]
         for job in jobs_to_delete:
             await db.delete(job)
-        logger.info(f"Nettoyage STT : {len(jobs_to_delete)} job(s) supprimé(s)")
+        logger.info("Nettoyage STT : %d job(s) supprimé(s)", len(jobs_to_delete))
 
 
 async def _save_stt_history(
@@ -49,127 +65,218 @@ async def _save_stt_history(
         db.add(job)
         await db.flush()
         await _cleanup_old_jobs_stt(user.id, db)
-        logger.info(f"Historique STT sauvegardé : {user.email}")
+        logger.info("Historique STT sauvegardé : %s", user.email)
 
     except Exception as e:
-        logger.error(f"Erreur sauvegarde historique STT : {e}")
+        logger.error("Erreur sauvegarde historique STT : %s", e)
         # Échec silencieux — la transcription est déjà retournée au client
 
 
-@router.get("/languages")
-def list_stt_languages():
-    # Fonction sync — get_supported_languages() ne fait pas d'I/O
-    return {"success": True, "languages": get_supported_languages()}
-
-
-@router.post("/upload")
-async def speech_to_text_upload(
-    file: UploadFile = File(...),
-    language: str = "auto",
-    current_user: User | None = Depends(get_optional_user),
-    db: AsyncSession = Depends(get_db)
-):
-    logger.info(f"Upload STT | fichier={file.filename} | langue={language}")
-
+def _check_upload_type(file: UploadFile) -> None:
     # Vérification souple — accepte audio/webm;codecs=opus et variantes
-    if not any(file.content_type.startswith(t) for t in ["audio/", "video/webm"]):
+    if not (file.content_type or "").startswith(ALLOWED_AUDIO_TYPE_PREFIXES):
         raise HTTPException(status_code=400, detail=f"Format non supporté : {file.content_type}")
 
-    # Lecture complète en mémoire pour vérifier la taille avant écriture sur disque
-    contents = await file.read()
-    file_size_mb = len(contents) / (1024 * 1024)
 
-    if file_size_mb > STT_MAX_FILE_SIZE_MB:
+def _check_upload_size(file: UploadFile, too_large_message: str) -> None:
+    # Taille lue sur le fichier déjà spoolé par Starlette — aucune copie
+    file.file.seek(0, os.SEEK_END)
+    size = file.file.tell()
+    file.file.seek(0)
+
+    if size > STT_MAX_FILE_SIZE_MB * 1024 * 1024:
         raise HTTPException(
             status_code=400,
-            detail=f"Fichier trop volumineux : {file_size_mb:.1f}MB > {STT_MAX_FILE_SIZE_MB}MB"
+            detail=f"{too_large_message} : {size / (1024 * 1024):.1f}MB > {STT_MAX_FILE_SIZE_MB}MB"
         )
 
-    # Nom de fichier unique — évite les collisions entre requêtes simultanées
-    unique_id = str(uuid.uuid4())[:8]
-    extension = os.path.splitext(file.filename)[1] or ".wav"
-    upload_filepath = os.path.join(STT_UPLOAD_DIR, f"upload_{unique_id}{extension}")
 
-    with open(upload_filepath, "wb") as f:
-        f.write(contents)
+async def _decode_upload(file: UploadFile) -> np.ndarray:
+    # Décodage PyAV hors boucle d'événements — fichier illisible = erreur client
+    try:
+        return await asyncio.to_thread(decode_upload, file.file)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Fichier audio illisible : {e}")
+
+
+async def _prepare_audio(
+    file: UploadFile,
+    language: str,
+    too_large_message: str
+) -> tuple[np.ndarray, str | None]:
+    # Prélude commun à tous les endpoints STT — taille → décodage mémoire → langue
+    _check_upload_size(file, too_large_message)
+
+    # Audio décodé en mémoire puis passé directement au modèle — aucun fichier temporaire
+    samples = await _decode_upload(file)
 
     # "auto" → None pour Whisper qui interprète None comme détection automatique
-    language_param = None if language == "auto" else language
-    result = transcribe_audio(upload_filepath, language=language_param)
+    return samples, None if language == "auto" else language
+
+
+async def _transcribe(
+    samples: np.ndarray,
+    language: str | None,
+    beam_size: int = 5,
+    word_timestamps: bool = False
+) -> dict:
+    # Whisper bloquant — exécuté dans le pool dédié pour libérer la boucle d'événements
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _STT_POOL,
+        partial(
+            transcribe_audio, samples,
+            language=language, beam_size=beam_size, word_timestamps=word_timestamps
+        )
+    )
+
+
+async def _ndjson_segments(
+    segments,
+    info,
+    start_time: float,
+    history_filename: str,
+    current_user: User | None,
+    db: AsyncSession
+):
+    # Une ligne JSON par segment dès qu'il sort du décodeur, puis une ligne finale
+    # récapitulative. Chaque next() bloquant passe par le pool STT
+    loop = asyncio.get_running_loop()
+    text_parts: list[str] = []
 
-    # Nettoyage du fichier temporaire — même en cas d'erreur de transcription
     try:
-        os.remove(upload_filepath)
+        while (item := await loop.run_in_executor(_STT_POOL, next, segments, None)) is not None:
+            segment, raw_text = item
+            text_parts.append(raw_text)
+            yield orjson.dumps(segment) + b"\n"
+
+        # Même assemblage et même refus du texte vide que POST /stt/upload
+        text = assemble_text(text_parts)
     except Exception as e:
-        logger.warning(f"Fichier temporaire non supprimé : {e}")
+        # Statut 200 déjà envoyé — l'échec est signalé dans le flux lui-même
+        logger.error("Erreur transcription en flux : %s", e)
+        yield orjson.dumps({"success": False, "error": str(e)}) + b"\n"
+        return
+
+    result = {
+        "success": True,
+        "text": text,
+        "language": info.language,
+        "language_probability": round(info.language_probability, 2),
+        "duration": round(time.time() - start_time, 2)
+    }
+
+    # Session DB encore ouverte — les dépendances yield ne se ferment qu'après la réponse
+    if current_user:
+        await _save_stt_history(current_user, history_filename, result, db)
+
+    logger.info("Transcription en flux terminée en %ss | langue=%s", result["duration"], result["language"])
+    yield orjson.dumps(result) + b"\n"
+
+
+@router.get("/languages")
+def list_stt_languages():
+    # Fonction sync — get_supported_languages() ne fait pas d'I/O
+    return OrjsonResponse({"success": True, "languages": get_supported_languages()})
+
+
+async def _handle_stt(
+    file: UploadFile,
+    language: str,
+    history_filename: str,
+    too_large_message: str,
+    beam_size: int,
+    word_timestamps: bool,
+    current_user: User | None,
+    db: AsyncSession
+) -> OrjsonResponse:
+    # Chemin commun upload / micro — prélude → Whisper → historique
+    samples, language_param = await _prepare_audio(file, language, too_large_message)
+    result = await _transcribe(samples, language_param, beam_size=beam_size, word_timestamps=word_timestamps)
 
     if not result["success"]:
         raise HTTPException(status_code=500, detail=f"Erreur transcription : {result['error']}")
 
     # Sauvegarde historique uniquement pour les utilisateurs connectés
     if current_user:
-        await _save_stt_history(current_user, file.filename, result, db)
+        await _save_stt_history(current_user, history_filename, result, db)
 
-    logger.info(f"Transcription réussie | langue={result['language']}")
+    logger.info("Transcription réussie | langue=%s", result["language"])
 
-    return {
+    # Réponse construite directement — court-circuite jsonable_encoder sur les segments
+    return OrjsonResponse({
         "success": True,
         "text": result["text"],
         "language": result["language"],
         "language_probability": result["language_probability"],
         "segments": result["segments"],
         "duration": result["duration"]
-    }
+    })
 
 
-@router.post("/record")
-async def speech_to_text_record(
+@router.post("/upload")
+async def speech_to_text_upload(
     file: UploadFile = File(...),
     language: str = "auto",
+    word_timestamps: bool = False,  # Timestamps mot par mot (segments[].words) — coût en plus
     current_user: User | None = Depends(get_optional_user),
     db: AsyncSession = Depends(get_db)
 ):
-    logger.info(f"Enregistrement micro STT | langue={language}")
+    logger.info("Upload STT | fichier=%s | langue=%s", file.filename, language)
+    _check_upload_type(file)
 
-    contents = await file.read()
-    file_size_mb = len(contents) / (1024 * 1024)
+    return await _handle_stt(
+        file, language, file.filename, "Fichier trop volumineux",
+        beam_size=5, word_timestamps=word_timestamps, current_user=current_user, db=db
+    )
 
-    if file_size_mb > STT_MAX_FILE_SIZE_MB:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Enregistrement trop volumineux : {file_size_mb:.1f}MB"
-        )
 
-    unique_id = str(uuid.uuid4())[:8]
-    upload_filepath = os.path.join(STT_UPLOAD_DIR, f"record_{unique_id}.webm")
+@router.post("/record")
+async def speech_to_text_record(
+    file: UploadFile = File(...),
+    language: str = "auto",
+    word_timestamps: bool = False,  # Timestamps mot par mot (segments[].words) — coût en plus
+    current_user: User | None = Depends(get_optional_user),
+    db: AsyncSession = Depends(get_db)
+):
+    logger.info("Enregistrement micro STT | langue=%s", language)
 
-    with open(upload_filepath, "wb") as f:
-        f.write(contents)
+    # Micro = usage temps réel — décodage greedy, environ deux fois plus rapide que beam 5
+    return await _handle_stt(
+        file, language, f"enregistrement_micro_{os.urandom(4).hex()}.webm", "Enregistrement trop volumineux",
+        beam_size=1, word_timestamps=word_timestamps, current_user=current_user, db=db
+    )
 
-    language_param = None if language == "auto" else language
-    result = transcribe_audio(upload_filepath, language=language_param)
 
-    try:
-        os.remove(upload_filepath)
-    except Exception as e:
-        logger.warning(f"Enregistrement temporaire non supprimé : {e}")
+@router.post("/upload/stream", response_model=None)
+async def speech_to_text_upload_stream(
+    file: UploadFile = File(...),
+    language: str = "auto",
+    word_timestamps: bool = False,
+    current_user: User | None = Depends(get_optional_user),
+    db: AsyncSession = Depends(get_db)
+):
+    # Même contrat d'entrée que POST /stt/upload, réponse en NDJSON : les segments
+    # arrivent au fil du décodage au lieu d'attendre la fin du fichier
+    logger.info("Upload STT en flux | fichier=%s | langue=%s", file.filename, language)
+    _check_upload_type(file)
 
-    if not result["success"]:
-        raise HTTPException(status_code=500, detail=f"Erreur transcription : {result['error']}")
+    samples, language_param = await _prepare_audio(file, language, "Fichier trop volumineux")
+    start_time = time.time()
 
-    if current_user:
-        await _save_stt_history(
-            current_user,
-            f"enregistrement_micro_{str(uuid.uuid4())[:8]}.webm",
-            result,
-            db
+    # VAD + détection de langue faits avant le premier octet — une erreur ici
+    # peut encore être renvoyée en 500 classique
+    loop = asyncio.get_running_loop()
+    try:
+        segments, info = await loop.run_in_executor(
+            _STT_POOL,
+            partial(stream_transcription, samples, language=language_param, word_timestamps=word_timestamps)
         )
+    except Exception as e:
+        logger.error("Erreur transcription en flux : %s", e)
+        raise HTTPException(status_code=500, detail=f"Erreur transcription : {e}")
 
-    return {
-        "success": True,
-        "text": result["text"],
-        "language": result["language"],
-        "language_probability": result["language_probability"],
-        "segments": result["segments"],
-        "duration": result["duration"]
-    }
\ No newline at end of file
+    return StreamingResponse(
+        _ndjson_segments(segments, info, start_time, file.filename, current_user, db),
+        media_type="application/x-ndjson"
+    )
@@ -1,14 +1,16 @@
-import os
+import asyncio
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
 
-from fastapi import APIRouter, HTTPException, Depends
-from fastapi.responses import FileResponse
-from pydantic import BaseModel, Field
+import orjson
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, desc
 
-from tts.tts_service import generate_audio, get_available_voices
-from config import TTS_OUTPUT_DIR, MAX_TEXT_LENGTH
+from tts.tts_service import AUDIO_MEDIA_TYPE, generate_audio, generate_audio_bytes, get_available_voices
+from config import MAX_TEXT_LENGTH, TTS_WORKERS
 from database import get_db
 from models.job_tts import JobTTS
 from models.user import User
@@ -17,86 +19,192 @@ from auth.dependencies import get_optional_user
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Pool borné — limite les synthèses Kokoro simultanées (contention GPU/CPU)
+_TTS_POOL = ThreadPoolExecutor(max_workers=TTS_WORKERS, thread_name_prefix="tts")
+
+# Langues acceptées — constante de module, pas de liste reconstruite par requête
+_LANGUAGES = frozenset(("fr", "en"))
+
+# Taille max du corps JSON — 6 octets/caractère couvre l'échappement \uXXXX,
+# plus une marge pour les autres champs
+_MAX_BODY_BYTES = MAX_TEXT_LENGTH * 6 + 1024
+
+
+# Schéma documentaire uniquement — le corps est parsé à la main dans text_to_speech,
+# Swagger l'affiche sans coût de validation Pydantic par requête
+TTS_REQUEST_SCHEMA = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {
+                "schema": {
+                    "type": "object",
+                    "required": ["text"],
+                    "properties": {
+                        "text":     {"type": "string", "example": "Bonjour, comment allez-vous ?"},
+                        "language": {"type": "string", "default": "fr", "example": "fr"},
+                        "voice":    {"type": "string", "default": "", "example": "ff_siwis"},
+                        "speed":    {"type": "number", "default": 1.0, "example": 1.0},
+                    },
+                }
+            }
+        },
+    }
+}
+
+
+# Voix statiques — sérialisées une seule fois au chargement du module
+_VOICES_JSON = orjson.dumps({"success": True, "voices": get_available_voices()})
+
+
+@router.get("/voices", response_model=None)
+def list_voices():
+    # Sync — corps JSON pré-encodé, ni sérialisation ni jsonable_encoder par requête
+    return Response(content=_VOICES_JSON, media_type="application/json")
 
-class TTSRequest(BaseModel):
-    text: str = Field(..., json_schema_extra={"example": "Bonjour, comment allez-vous ?"})
-    language: str = Field(default="fr", json_schema_extra={"example": "fr"})
-    voice: str = Field(default="", json_schema_extra={"example": "ff_siwis"})
-    speed: float = Field(default=1.0, json_schema_extra={"example": 1.0})
 
+async def _parse_tts_request(request: Request) -> tuple[str, str, str, float]:
+    # Borne en octets avant tout parsing — rejet immédiat des corps démesurés
+    raw = await request.body()
+    if len(raw) > _MAX_BODY_BYTES:
+        raise HTTPException(status_code=413, detail="Requête trop volumineuse")
 
-@router.get("/voices")
-def list_voices():
-    # Sync — retourne une liste statique, pas d'I/O
-    return {"success": True, "voices": get_available_voices()}
+    # Parsing manuel — évite la double validation Pydantic + validations métier
+    try:
+        data = orjson.loads(raw)
+    except orjson.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Corps JSON invalide")
 
+    if not isinstance(data, dict):
+        raise HTTPException(status_code=400, detail="Corps JSON invalide")
 
-@router.post("/tts")
-async def text_to_speech(
-    request: TTSRequest,
-    current_user: User | None = Depends(get_optional_user),
-    db: AsyncSession = Depends(get_db)
-):
-    # Validations métier — au-delà de ce que Pydantic peut vérifier seul
-    if not request.text.strip():
+    text = data.get("text", "")
+    language = data.get("language", "fr")
+    voice = data.get("voice", "") or ""
+
+    if not isinstance(text, str) or not isinstance(language, str) or not isinstance(voice, str):
+        raise HTTPException(status_code=400, detail="Champs texte, langue et voix attendus en chaînes")
+
+    try:
+        speed = float(data.get("speed", 1.0))
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Vitesse invalide : nombre attendu")
+
+    if not text.strip():
         raise HTTPException(status_code=400, detail="Le texte ne peut pas être vide")
 
-    if len(request.text) > MAX_TEXT_LENGTH:
+    text_length = len(text)
+    if text_length > MAX_TEXT_LENGTH:
         raise HTTPException(
             status_code=400,
-            detail=f"Texte trop long : {len(request.text)} > {MAX_TEXT_LENGTH} caractères"
+            detail=f"Texte trop long : {text_length} > {MAX_TEXT_LENGTH} caractères"
         )
 
-    if request.language not in ["fr", "en"]:
+    if language not in _LANGUAGES:
         raise HTTPException(
             status_code=400,
-            detail=f"Langue non supportée : '{request.language}'. Utilisez 'fr' ou 'en'"
+            detail=f"Langue non supportée : '{language}'. Utilisez 'fr' ou 'en'"
         )
 
-    result = generate_audio(
-        text=request.text,
-        language=request.language,
-        voice=request.voice,
-        speed=request.speed
+    return text, language, voice, speed
+
+
+async def _run_tts(func, text: str, language: str, voice: str, speed: float) -> dict:
+    # Kokoro bloquant — exécuté dans le pool dédié pour libérer la boucle d'événements
+    loop = asyncio.get_running_loop()
+    result = await loop.run_in_executor(
+        _TTS_POOL,
+        partial(func, text=text, language=language, voice=voice, speed=speed)
     )
 
     if not result["success"]:
         raise HTTPException(status_code=500, detail=f"Erreur génération audio : {result['error']}")
 
+    return result
+
+
+async def _save_tts_history(
+    user: User,
+    text: str,
+    voice: str,
+    language: str,
+    audio_url: str | None,
+    db: AsyncSession
+) -> None:
+    try:
+        job = JobTTS(
+            user_id=user.id,
+            input_text=text[:500],  # Troncature — 2000 chars trop long pour l'historique
+            voice=voice,
+            language=language,
+            audio_url=audio_url,
+        )
+        db.add(job)
+        await db.flush()
+        await _cleanup_old_jobs_tts(user.id, db)
+        logger.info("Historique TTS sauvegardé : %s", user.email)
+
+    except Exception as e:
+        # Échec silencieux — l'audio est déjà généré, ne pas bloquer la réponse
+        logger.error("Erreur sauvegarde historique TTS : %s", e)
+
+
+@router.post("/tts", response_model=None, openapi_extra=TTS_REQUEST_SCHEMA)
+async def text_to_speech(
+    request: Request,
+    current_user: User | None = Depends(get_optional_user),
+    db: AsyncSession = Depends(get_db)
+):
+    text, language, voice, speed = await _parse_tts_request(request)
+    result = await _run_tts(generate_audio, text, language, voice, speed)
+
     # Historique persisté uniquement pour les utilisateurs connectés
     if current_user:
-        try:
-            job = JobTTS(
-                user_id=current_user.id,
-                input_text=request.text[:500],  # Troncature — 2000 chars trop long pour l'historique
-                voice=result.get("voice", request.voice) or request.voice,
-                language=request.language,
-                audio_url=f"/audio/{result['filename']}",
-            )
-            db.add(job)
-            await db.flush()
-            await _cleanup_old_jobs_tts(current_user.id, db)
-            logger.info(f"Historique TTS sauvegardé : {current_user.email}")
-
-        except Exception as e:
-            # Échec silencieux — l'audio est déjà généré, ne pas bloquer la réponse
-            logger.error(f"Erreur sauvegarde historique TTS : {e}")
-
-    logger.info(f"Audio généré : {result['filename']}")
-
-    # Headers personnalisés — expose les métadonnées au frontend sans corps JSON séparé
-    return FileResponse(
-        path=result["filepath"],
-        media_type="audio/wav",
-        filename=result["filename"],
+        await _save_tts_history(
+            current_user, text, result.get("voice", voice) or voice, language,
+            f"/audio/{result['filename']}", db
+        )
+
+    # Fichier de quelques MB au plus — lu en une fois (un seul aller-retour thread, sans stat
+    # préalable) puis envoyé en un unique http.response.body
+    audio_bytes = await asyncio.to_thread(Path(result["filepath"]).read_bytes)
+
+    # Headers personnalisés — expose les métadonnées au frontend sans corps JSON séparé.
+    # Access-Control-Expose-Headers est ajouté par FastCORS (headers précalculés)
+    return Response(
+        content=audio_bytes,
+        media_type=AUDIO_MEDIA_TYPE,
         headers={
+            "Content-Disposition": f'attachment; filename="{result["filename"]}"',
             "X-Generation-Duration": str(result["duration"]),
             "X-Audio-Filename": result["filename"],
-            "Access-Control-Expose-Headers": "X-Generation-Duration, X-Audio-Filename, Content-Disposition"
         }
     )
 
 
+@router.post("/tts/stream", response_model=None, openapi_extra=TTS_REQUEST_SCHEMA)
+async def text_to_speech_stream(
+    request: Request,
+    current_user: User | None = Depends(get_optional_user),
+    db: AsyncSession = Depends(get_db)
+):
+    # Même contrat que POST /tts, sans fichier sur disque — l'audio n'est pas
+    # retéléchargeable via /audio/, l'historique est donc sauvegardé sans URL
+    text, language, voice, speed = await _parse_tts_request(request)
+    result = await _run_tts(generate_audio_bytes, text, language, voice, speed)
+
+    if current_user:
+        await _save_tts_history(
+            current_user, text, result.get("voice", voice) or voice, language, None, db
+        )
+
+    return Response(
+        content=result["audio"],
+        media_type=AUDIO_MEDIA_TYPE,
+        headers={"X-Generation-Duration": str(result["duration"])}
+    )
+
+
 async def _cleanup_old_jobs_tts(user_id: str, db: AsyncSession) -> None:
     result = await db.execute(
         select(JobTTS)
@@ -109,14 +217,4 @@ async def _cleanup_old_jobs_tts(user_id: str, db: AsyncSession) -> None:
         jobs_to_delete = jobs[5:]
         for job in jobs_to_delete:
             await db.delete(job)
-        logger.info(f"Nettoyage TTS : {len(jobs_to_delete)} job(s) supprimé(s)")
-
-
-@router.get("/audio/{filename}")
-def download_audio(filename: str):
-    filepath = os.path.join(TTS_OUTPUT_DIR, filename)
-
-    if not os.path.exists(filepath):
-        raise HTTPException(status_code=404, detail=f"Fichier '{filename}' introuvable")
-
-    return FileResponse(path=filepath, media_type="audio/wav", filename=filename)
\ No newline at end of file
+        logger.info("Nettoyage TTS : %d job(s) supprimé(s)", len(jobs_to_delete))
\ No newline at end of file
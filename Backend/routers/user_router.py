@@ -1,8 +1,11 @@
 import logging
+from datetime import datetime, timedelta, timezone
+
 from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, desc
 
+from config import TTS_OUTPUT_MAX_AGE_SECONDS
 from database import get_db
 from models.user import User
 from models.job_youtube import JobYoutube
@@ -55,6 +58,22 @@ async def _get_stt_history(user_id: str, db: AsyncSession) -> list[JobSTT]:
     return result.scalars().all()
 
 
+def _tts_responses(jobs: list[JobTTS]) -> list[JobTTSResponse]:
+    # Les fichiers audio_* sont supprimés après TTS_OUTPUT_MAX_AGE_SECONDS (main.py) —
+    # audio_url masqué au-delà pour ne pas exposer un lien de téléchargement en 404
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=TTS_OUTPUT_MAX_AGE_SECONDS)
+    responses = []
+    for job in jobs:
+        response = JobTTSResponse.model_validate(job)
+        created_at = response.created_at
+        if created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=timezone.utc)  # Horodatages stockés en UTC
+        if created_at < cutoff:
+            response.audio_url = None
+        responses.append(response)
+    return responses
+
+
 # ── Endpoints ─────────────────────────────────────────────────────────────────
 
 @router.get("/me/history", response_model=HistoryResponse)
@@ -69,7 +88,7 @@ async def get_full_history(
 
     return HistoryResponse(
         youtube=[JobYoutubeResponse.model_validate(j) for j in youtube_jobs],
-        tts=[JobTTSResponse.model_validate(j) for j in tts_jobs],
+        tts=_tts_responses(tts_jobs),
         stt=[JobSTTResponse.model_validate(j) for j in stt_jobs],
         total=len(youtube_jobs) + len(tts_jobs) + len(stt_jobs),
     )
@@ -90,7 +109,7 @@ async def get_tts_history(
     db: AsyncSession = Depends(get_db)
 ):
     jobs = await _get_tts_history(current_user.id, db)
-    return [JobTTSResponse.model_validate(j) for j in jobs]
+    return _tts_responses(jobs)
 
 
 @router.get("/me/history/stt", response_model=list[JobSTTResponse])
@@ -1,54 +1,124 @@
 import logging
 import time
+from typing import BinaryIO, Iterator
 
-from faster_whisper import WhisperModel
-from config import STT_MODEL_SIZE, STT_DEVICE, STT_COMPUTE_TYPE
+import numpy as np
+from faster_whisper import BatchedInferencePipeline, WhisperModel, decode_audio
+from config import (
+    STT_MODEL_SIZE, STT_DEVICE, STT_COMPUTE_TYPE,
+    STT_BATCH_SIZE, STT_CPU_THREADS, STT_WORKERS, STT_VAD_FILTER
+)
 
 logger = logging.getLogger(__name__)
 
+SAMPLE_RATE = 16000  # Fréquence d'entrée attendue par Whisper
+
 # Chargement unique au démarrage — Whisper small ~465MB téléchargé depuis HuggingFace
-logger.info(f"Chargement Faster-Whisper ({STT_MODEL_SIZE})...")
+logger.info("Chargement Faster-Whisper (%s)...", STT_MODEL_SIZE)
 stt_model = WhisperModel(
     STT_MODEL_SIZE,
     device=STT_DEVICE,
-    compute_type=STT_COMPUTE_TYPE
+    compute_type=STT_COMPUTE_TYPE,
+    cpu_threads=STT_CPU_THREADS,   # Threads par transcription — × num_workers = cœurs
+    num_workers=STT_WORKERS        # Transcriptions concurrentes sur le même modèle
 )
 logger.info("Faster-Whisper prêt")
 
 
-def transcribe_audio(filepath: str, language: str = None) -> dict:
+def decode_upload(fileobj: BinaryIO) -> np.ndarray:
+    # Décodage en mémoire (PyAV) → float32 mono 16 kHz, format natif de Whisper.
+    # Évite l'écriture sur disque puis la réouverture du fichier par faster-whisper
+    return decode_audio(fileobj, sampling_rate=SAMPLE_RATE)
+
+
+def _run_model(
+    audio: str | np.ndarray,
+    language: str | None,
+    beam_size: int,
+    word_timestamps: bool
+) -> tuple:
+    # transcribe() retourne un générateur de segments + des infos sur l'audio
+    if STT_VAD_FILTER:
+        # Inférence batchée — plusieurs fenêtres de 30s encodées en une seule passe,
+        # découpées par le VAD Silero (silences et passages sans parole ignorés).
+        # Pipeline créé par appel : simple enveloppe du modèle partagé, mais il garde
+        # un état par transcription (last_speech_timestamp) qui ne doit pas être
+        # partagé entre requêtes concurrentes
+        return BatchedInferencePipeline(model=stt_model).transcribe(
+            audio,
+            batch_size=STT_BATCH_SIZE,
+            language=language,      # None = détection automatique de la langue
+            beam_size=beam_size,    # Précision vs vitesse — 5 standard, 1 = greedy temps réel
+            word_timestamps=word_timestamps,  # Passe DTW supplémentaire — uniquement sur demande
+            vad_filter=True,
+            vad_parameters={"min_silence_duration_ms": 500, "threshold": 0.5}
+        )
+
+    # Sans VAD, le mode batché ne sait pas découper l'audio > 30s — mode séquentiel
+    return stt_model.transcribe(
+        audio,
+        language=language,
+        beam_size=beam_size,
+        word_timestamps=word_timestamps
+    )
+
+
+def _segment_to_dict(segment, word_timestamps: bool) -> dict:
+    # Timestamps bruts — le formatage de l'affichage est laissé au client.
+    # Mots arrondis à 10 ms et segments à 1 ms par faster-whisper en mode batché ;
+    # en mode séquentiel (STT_VAD_FILTER=false) start/end de segment ne sont pas
+    # arrondis et peuvent porter du bruit flottant (ex. 3.4000000000000004)
+    segment_data = {
+        "start": segment.start,
+        "end":   segment.end,
+        "text":  segment.text.strip()
+    }
+    if word_timestamps:
+        segment_data["words"] = [
+            {"start": w.start, "end": w.end, "word": w.word}
+            for w in segment.words
+        ]
+    return segment_data
+
+
+def assemble_text(text_parts: list[str]) -> str:
+    # Textes bruts des segments (espaces de tête inclus) — assemblés une seule fois,
+    # pas de += quadratique. Partagé par les réponses bloquante et en flux
+    full_text = "".join(text_parts).strip()
+    if not full_text:
+        raise ValueError("Aucun texte transcrit — audio vide ou inaudible")
+    return full_text
+
+
+def transcribe_audio(
+    audio: str | np.ndarray,
+    language: str = None,
+    beam_size: int = 5,
+    word_timestamps: bool = False
+) -> dict:
+    # audio : chemin de fichier, ou échantillons déjà décodés par decode_upload()
     start_time = time.time()
 
     try:
-        logger.info(f"Transcription : {filepath} | langue={language or 'auto'}")
+        if isinstance(audio, np.ndarray):
+            logger.info("Transcription : %.1fs d'audio PCM | langue=%s", len(audio) / SAMPLE_RATE, language or "auto")
+        else:
+            logger.info("Transcription : %s | langue=%s", audio, language or "auto")
 
-        # transcribe() retourne un générateur de segments + des infos sur l'audio
-        segments, info = stt_model.transcribe(
-            filepath,
-            language=language,      # None = détection automatique de la langue
-            beam_size=5,            # Précision vs vitesse — 5 est le standard
-            word_timestamps=True    # Timestamps mot par mot — utile pour la synchro vidéo
-        )
+        segments, info = _run_model(audio, language, beam_size, word_timestamps)
 
         # Consommation du générateur — les segments ne sont calculés qu'à l'itération
         segments_list = []
-        full_text = ""
+        text_parts: list[str] = []
 
         for segment in segments:
-            segments_list.append({
-                "start": round(segment.start, 2),
-                "end":   round(segment.end, 2),
-                "text":  segment.text.strip()
-            })
-            full_text += segment.text
-
-        full_text = full_text.strip()
+            segments_list.append(_segment_to_dict(segment, word_timestamps))
+            text_parts.append(segment.text)
 
-        if not full_text:
-            raise ValueError("Aucun texte transcrit — audio vide ou inaudible")
+        full_text = assemble_text(text_parts)
 
         duration = round(time.time() - start_time, 2)
-        logger.info(f"Transcription réussie en {duration}s | langue={info.language}")
+        logger.info("Transcription réussie en %ss | langue=%s", duration, info.language)
 
         return {
             "success":              True,
@@ -62,7 +132,7 @@ def transcribe_audio(filepath: str, language: str = None) -> dict:
 
     except Exception as e:
         duration = round(time.time() - start_time, 2)
-        logger.error(f"Erreur transcription : {e}")
+        logger.error("Erreur transcription : %s", e)
 
         return {
             "success":              False,
@@ -75,6 +145,21 @@ def transcribe_audio(filepath: str, language: str = None) -> dict:
         }
 
 
+def stream_transcription(
+    audio: np.ndarray,
+    language: str = None,
+    beam_size: int = 5,
+    word_timestamps: bool = False
+) -> tuple[Iterator[tuple[dict, str]], object]:
+    # Variante en flux de transcribe_audio — lève en cas d'échec au lieu de retourner
+    # un dict d'erreur. La détection de langue (info) est faite ici ; les segments
+    # ne sont décodés qu'à l'itération, un par un, sans liste intermédiaire.
+    # Chaque élément : (segment sérialisable, texte brut pour assemble_text)
+    logger.info("Transcription en flux : %.1fs d'audio PCM | langue=%s", len(audio) / SAMPLE_RATE, language or "auto")
+    segments, info = _run_model(audio, language, beam_size, word_timestamps)
+    return ((_segment_to_dict(segment, word_timestamps), segment.text) for segment in segments), info
+
+
 def get_supported_languages() -> list:
     # Sous-ensemble des 99 langues Whisper — uniquement celles exposées par l'API
     return [
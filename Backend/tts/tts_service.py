@@ -1,8 +1,9 @@
+import io
 import os
 import sys
 import logging
-import uuid
 import time
+import threading
 
 import numpy as np
 import soundfile as sf
@@ -23,11 +24,33 @@ os.environ["HF_TOKEN"] = os.getenv("HF_TOKEN", "")
 
 logger = logging.getLogger(__name__)
 
-# Chargement unique au démarrage — modèle 82M paramètres téléchargé depuis HuggingFace
-logger.info("Chargement des pipelines Kokoro...")
-pipeline_fr = KPipeline(lang_code='f', repo_id='hexgrad/Kokoro-82M')
-pipeline_en = KPipeline(lang_code='a', repo_id='hexgrad/Kokoro-82M')
-logger.info("Pipelines Kokoro chargés")
+# Pipelines Kokoro chargés à la demande, une fois par langue — un déploiement
+# monolingue ne paie ni le temps de chargement ni la mémoire de l'autre langue
+_PIPELINES: dict[str, KPipeline] = {}
+
+# Mutex — deux threads du pool TTS ne doivent pas charger la même langue en double
+_pipelines_lock = threading.Lock()
+
+# Préfixe des fichiers générés — seul motif supprimé par le nettoyage périodique (main.py)
+AUDIO_FILENAME_PREFIX = "audio_"
+
+# Préfixe du dossier de sortie — calculé une fois au lieu d'un os.path.join par requête
+_OUTPUT_DIR_PREFIX = os.path.join(TTS_OUTPUT_DIR, "")
+
+# Conteneur/codec soundfile et type MIME par AUDIO_FORMAT — Opus divise la taille
+# de la réponse par ~15 par rapport au WAV PCM 16 bits, pour une qualité voix équivalente
+_AUDIO_CODECS = {
+    "wav":  ("WAV", "PCM_16", "audio/wav"),
+    "ogg":  ("OGG", "OPUS", "audio/ogg"),
+    "flac": ("FLAC", "PCM_16", "audio/flac"),
+}
+if AUDIO_FORMAT not in _AUDIO_CODECS:
+    raise ValueError(f"AUDIO_FORMAT invalide : {AUDIO_FORMAT} (attendu : {', '.join(_AUDIO_CODECS)})")
+_SF_FORMAT, _SF_SUBTYPE, AUDIO_MEDIA_TYPE = _AUDIO_CODECS[AUDIO_FORMAT]
+
+# Extension → type MIME — utilisé par le montage /audio, y compris pour les fichiers
+# écrits avant un changement d'AUDIO_FORMAT
+AUDIO_MEDIA_TYPES = {ext: media_type for ext, (_, _, media_type) in _AUDIO_CODECS.items()}
 
 # Voix disponibles par langue — exposées via GET /voices
 AVAILABLE_VOICES = {
@@ -38,13 +61,46 @@ AVAILABLE_VOICES = {
 }
 
 
+def _get_pipeline(lang_code: str) -> KPipeline:
+    pipeline = _PIPELINES.get(lang_code)
+    if pipeline is not None:
+        return pipeline
+
+    with _pipelines_lock:
+        # Revérifié sous verrou — un autre thread a pu charger entre-temps
+        if lang_code not in _PIPELINES:
+            # Modèle 82M paramètres téléchargé depuis HuggingFace au premier appel
+            logger.info("Chargement du pipeline Kokoro '%s'...", lang_code)
+            _PIPELINES[lang_code] = KPipeline(lang_code=lang_code, repo_id='hexgrad/Kokoro-82M')
+            logger.info("Pipeline Kokoro '%s' chargé", lang_code)
+        return _PIPELINES[lang_code]
+
+
 def get_pipeline_and_voice(language: str, voice: str) -> tuple:
     # Centralisé ici — évite le if/else répété dans generate_audio et generate_tts_segments
     if language == "fr":
-        return pipeline_fr, voice or DEFAULT_VOICE_FR
+        return _get_pipeline('f'), voice or DEFAULT_VOICE_FR
     else:
         # Tout ce qui n'est pas "fr" → pipeline anglais
-        return pipeline_en, voice or DEFAULT_VOICE_EN
+        return _get_pipeline('a'), voice or DEFAULT_VOICE_EN
+
+
+def _write_audio(target, generator) -> None:
+    # target : chemin de fichier ou buffer io.BytesIO.
+    # Écriture en flux — chaque chunk est écrit dès sa génération,
+    # sans liste intermédiaire ni np.concatenate (une seule copie de l'audio)
+    samples_written = 0
+
+    # 24000 Hz = fréquence d'échantillonnage native de Kokoro (supportée telle quelle par Opus)
+    with sf.SoundFile(target, "w", samplerate=24000, channels=1, format=_SF_FORMAT, subtype=_SF_SUBTYPE) as snd:
+        for (gs, ps, audio) in generator:
+            # gs = graphèmes (texte du chunk), ps = phonèmes, audio = tenseur CPU
+            chunk = np.asarray(audio)
+            snd.write(chunk)
+            samples_written += len(chunk)
+
+    if not samples_written:
+        raise ValueError("Aucun audio généré — texte vide ou erreur Kokoro")
 
 
 def generate_audio(
@@ -57,32 +113,26 @@ def generate_audio(
 
     try:
         pipeline, selected_voice = get_pipeline_and_voice(language, voice)
-        logger.info(f"TTS | langue={language} | voix={selected_voice} | texte={text[:50]}...")
+        logger.info("TTS | langue=%s | voix=%s | texte=%.50s...", language, selected_voice, text)
+
+        # Nom de fichier unique — évite les collisions entre requêtes simultanées
+        unique_id = os.urandom(4).hex()
+        filename = f"{AUDIO_FILENAME_PREFIX}{unique_id}.{AUDIO_FORMAT}"
+        filepath = _OUTPUT_DIR_PREFIX + filename
 
         # Kokoro retourne un générateur — chaque itération produit un chunk audio
         generator = pipeline(text, voice=selected_voice, speed=speed)
 
-        audio_chunks = []
-        for (gs, ps, audio) in generator:
-            # gs = graphèmes (texte du chunk), ps = phonèmes, audio = numpy array
-            audio_chunks.append(audio)
-
-        if not audio_chunks:
-            raise ValueError("Aucun audio généré — texte vide ou erreur Kokoro")
-
-        # Assemblage de tous les chunks en un seul tableau continu
-        full_audio = np.concatenate(audio_chunks)
-
-        # Nom de fichier unique — évite les collisions entre requêtes simultanées
-        unique_id = str(uuid.uuid4())[:8]
-        filename = f"audio_{unique_id}.{AUDIO_FORMAT}"
-        filepath = os.path.join(TTS_OUTPUT_DIR, filename)
-
-        # 24000 Hz = fréquence d'échantillonnage native de Kokoro
-        sf.write(filepath, full_audio, 24000)
+        try:
+            _write_audio(filepath, generator)
+        except Exception:
+            # Pas de fichier audio partiel ou vide laissé dans le dossier de sortie
+            if os.path.exists(filepath):
+                os.remove(filepath)
+            raise
 
         duration = round(time.time() - start_time, 2)
-        logger.info(f"Audio généré : {filename} en {duration}s")
+        logger.info("Audio généré : %s en %ss", filename, duration)
 
         return {
             "success":  True,
@@ -95,7 +145,7 @@ def generate_audio(
 
     except Exception as e:
         duration = round(time.time() - start_time, 2)
-        logger.error(f"Erreur génération audio : {e}")
+        logger.error("Erreur génération audio : %s", e)
 
         return {
             "success":  False,
@@ -107,5 +157,46 @@ def generate_audio(
         }
 
 
+def generate_audio_bytes(
+    text: str,
+    language: str = "fr",
+    voice: str = "",
+    speed: float = DEFAULT_SPEED
+) -> dict:
+    # Variante sans disque de generate_audio — audio construit en mémoire et retourné
+    # tel quel : ni écriture, ni relecture, ni fichier à nettoyer
+    start_time = time.time()
+
+    try:
+        pipeline, selected_voice = get_pipeline_and_voice(language, voice)
+        logger.info("TTS mémoire | langue=%s | voix=%s | texte=%.50s...", language, selected_voice, text)
+
+        buffer = io.BytesIO()
+        _write_audio(buffer, pipeline(text, voice=selected_voice, speed=speed))
+
+        duration = round(time.time() - start_time, 2)
+        logger.info("Audio généré en mémoire en %ss", duration)
+
+        return {
+            "success":  True,
+            "audio":    buffer.getvalue(),
+            "voice":    selected_voice,
+            "duration": duration,
+            "error":    None
+        }
+
+    except Exception as e:
+        duration = round(time.time() - start_time, 2)
+        logger.error("Erreur génération audio : %s", e)
+
+        return {
+            "success":  False,
+            "audio":    None,
+            "voice":    None,
+            "duration": duration,
+            "error":    str(e)
+        }
+
+
 def get_available_voices() -> dict:
     return AVAILABLE_VOICES
\ No newline at end of file
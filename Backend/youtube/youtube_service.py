@@ -94,9 +94,9 @@ from config import (
     # cuda = utilise le GPU NVIDIA → beaucoup plus rapide
 
     STT_COMPUTE_TYPE
-    # STT_COMPUTE_TYPE = "float16"
-    # Précision des calculs sur GPU
-    # float16 = demi-précision → plus rapide, assez précis pour notre usage
+    # STT_COMPUTE_TYPE = "int8_float16" (GPU) / "int8" (CPU)
+    # Précision des calculs
+    # int8 = poids quantifiés 8 bits → plus rapide et plus léger, assez précis pour notre usage
 )
 # POURQUOI importer depuis config.py ?
 # Centraliser la configuration évite de répéter les mêmes valeurs partout
@@ -129,7 +129,7 @@ logger.info(f"Chargement du modèle Whisper YouTube ({YOUTUBE_WHISPER_MODEL})...
 youtube_whisper_model = WhisperModel(
     YOUTUBE_WHISPER_MODEL,      # "medium" → plus précis que "small"
     device=STT_DEVICE,          # "cuda" → utilise le GPU
-    compute_type=STT_COMPUTE_TYPE  # "float16" → calculs rapides sur GPU
+    compute_type=STT_COMPUTE_TYPE  # "int8_float16" → calculs rapides sur GPU
 )
 
 logger.info("Modèle Whisper YouTube chargé !")
@@ -523,8 +523,9 @@ def generate_tts_segments(
         # -----------------------------------------------------------------
         pipeline, selected_voice = get_pipeline_and_voice(target_language, voice)
         # get_pipeline_and_voice retourne :
-        # - pipeline_fr si target_language == "fr"
-        # - pipeline_en sinon
+        # - _get_pipeline('f') si target_language == "fr"
+        # - _get_pipeline('a') sinon
+        #   (pipelines Kokoro chargés à la demande au premier appel, puis réutilisés)
         # - la voix sélectionnée (par défaut si voice == "")
         logger.info(f"Pipeline TTS sélectionné | langue={target_language} | voix={selected_voice}")
 